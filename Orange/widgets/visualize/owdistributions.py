@@ -1,5 +1,6 @@
 from functools import partial, reduce
-from itertools import count, groupby, repeat
+from itertools import count, repeat
+from typing import Any, Callable, NamedTuple, Optional, Tuple
 from xml.sax.saxutils import escape
 
 import numpy as np
@@ -7,15 +8,15 @@ from scipy.stats import norm, rayleigh, beta, gamma, pareto, expon
 
 from AnyQt.QtWidgets import QGraphicsRectItem
 from AnyQt.QtGui import QColor, QPen, QBrush, QPainter, QPalette, QPolygonF, \
-    QFontMetrics
-from AnyQt.QtCore import Qt, QRectF, QPointF, pyqtSignal as Signal
+    QFontMetrics, QPicture
+from AnyQt.QtCore import Qt, QRect, QRectF, QPointF, QSize, QTimer, \
+    pyqtSignal as Signal
 from orangewidget.utils.listview import ListViewSearch
 import pyqtgraph as pg
 
 from Orange.data import Table, DiscreteVariable, ContinuousVariable, Domain
 from Orange.preprocess.discretize import decimal_binnings, time_binnings, \
     short_time_units
-from Orange.statistics import distribution, contingency
 from Orange.widgets import gui, settings
 from Orange.widgets.utils.annotated_data import \
     create_groups_table, create_annotated_table, ANNOTATED_DATA_SIGNAL_NAME
@@ -77,7 +78,15 @@ class DistributionBarItem(pg.GraphicsObject):
         self.padding = padding
         self.stacked = stacked
         self.expanded = expanded
+        if expanded:
+            tot = np.sum(freqs)
+            self._plot_freqs = np.asarray(freqs) / tot if tot else None
+        else:
+            self._plot_freqs = freqs
+        if stacked and self._plot_freqs is not None:
+            self._stack_ys = np.concatenate(([0.], np.cumsum(self._plot_freqs)))
         self.__picture = None
+        self.__picture_padding = None
         self.polygon = None
         self.hovered = False
         self._tooltip = tooltip
@@ -89,6 +98,10 @@ class DistributionBarItem(pg.GraphicsObject):
     def hoverEnterEvent(self, event):
         super().hoverEnterEvent(event)
         self.hovered = True
+        if not self.hidden and callable(self._tooltip):
+            # tooltip was given as a function, so compute it on first hover
+            self._tooltip = self._tooltip()
+            self.setToolTip(self._tooltip)
         self.update()
 
     def hoverLeaveEvent(self, event):
@@ -98,53 +111,58 @@ class DistributionBarItem(pg.GraphicsObject):
 
     def setHidden(self, hidden):
         self.hidden = hidden
-        if not hidden:
+        if not hidden and not callable(self._tooltip):
             self.setToolTip(self._tooltip)
 
     def paint(self, painter, _options, _widget):
-        if self.hidden:
+        freqs = self._plot_freqs
+        if self.hidden or freqs is None:
             return
 
-        if self.expanded:
-            tot = np.sum(self.freqs)
-            if tot == 0:
-                return
-            freqs = self.freqs / tot
-        else:
-            freqs = self.freqs
-
         if not self.padding:
             padding = self.mapRectFromDevice(QRectF(0, 0, 0.5, 0)).width()
         else:
             padding = min(20, self.width * self.padding)
         sx = self.x + padding
         padded_width = self.width - 2 * padding
-
-        if self.stacked:
-            painter.setPen(Qt.NoPen)
-            y = 0
-            for freq, color in zip(freqs, self.colors):
-                painter.setBrush(QBrush(color))
-                painter.drawRect(QRectF(sx, y, padded_width, freq))
-                y += freq
-            self.polygon = QPolygonF(QRectF(sx, 0, padded_width, y))
-        else:
-            polypoints = [QPointF(sx, 0)]
-            pen = QPen(QBrush(Qt.white), 0.5)
-            pen.setCosmetic(True)
-            painter.setPen(pen)
-            wsingle = padded_width / len(self.freqs)
-            for i, freq, color in zip(count(), freqs, self.colors):
-                painter.setBrush(QBrush(color))
-                x = sx + wsingle * i
-                painter.drawRect(
-                    QRectF(x, 0, wsingle, freq))
-                polypoints += [QPointF(x, freq),
-                               QPointF(x + wsingle, freq)]
-            polypoints += [QPointF(polypoints[-1].x(), 0), QPointF(sx, 0)]
-            self.polygon = QPolygonF(polypoints)
+        wsingle = padded_width / len(self.freqs)
+
+        # Bars are static, so record them once and replay the picture;
+        # padding can depend on the view's scale, hence re-record on change
+        if self.__picture is None or padding != self.__picture_padding:
+            self.__picture = QPicture()
+            self.__picture_padding = padding
+            pic_painter = QPainter(self.__picture)
+            if self.stacked:
+                pic_painter.setPen(Qt.NoPen)
+                for y, freq, color in zip(self._stack_ys, freqs, self.colors):
+                    pic_painter.setBrush(QBrush(color))
+                    pic_painter.drawRect(QRectF(sx, y, padded_width, freq))
+            else:
+                pen = QPen(QBrush(Qt.white), 0.5)
+                pen.setCosmetic(True)
+                pic_painter.setPen(pen)
+                for i, freq, color in zip(count(), freqs, self.colors):
+                    pic_painter.setBrush(QBrush(color))
+                    x = sx + wsingle * i
+                    pic_painter.drawRect(
+                        QRectF(x, 0, wsingle, freq))
+            pic_painter.end()
+        painter.drawPicture(0, 0, self.__picture)
 
         if self.hovered:
+            # the outline is only needed when hovered, so construct it here
+            if self.stacked:
+                self.polygon = QPolygonF(
+                    QRectF(sx, 0, padded_width, self._stack_ys[-1]))
+            else:
+                polypoints = [QPointF(sx, 0)]
+                for i, freq in enumerate(freqs):
+                    x = sx + wsingle * i
+                    polypoints += [QPointF(x, freq),
+                                   QPointF(x + wsingle, freq)]
+                polypoints += [QPointF(polypoints[-1].x(), 0), QPointF(sx, 0)]
+                self.polygon = QPolygonF(polypoints)
             pen = QPen(QBrush(Qt.blue), 2, Qt.DashLine)
             pen.setCosmetic(True)
             painter.setPen(pen)
@@ -177,10 +195,29 @@ class DistributionWidget(PlotWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.last_item = None
+        self.set_bar_items([], np.empty(0), np.empty(0))
+
+    def set_bar_items(self, items, x0, x1):
+        # Bars are ordered by x and do not overlap, so their edges are sorted;
+        # the widget owns the arrays of left and right edges
+        self._bar_items = items
+        self._bar_x0 = x0
+        self._bar_x1 = x1
 
     def _get_bar_item(self, pos):
-        for item in self.items(pos):
-            if isinstance(item, DistributionBarItem):
+        if not self._bar_items:
+            return None
+        # Find the bar by binary search instead of querying the scene;
+        # like QGraphicsView.items, test the area of the pixel at pos
+        rect = self._bar_items[0].mapRectFromScene(
+            self.mapToScene(QRect(pos, QSize(1, 1))).boundingRect())
+        # candidates are bars that start before the pixel's right edge and
+        # end after its left edge; with narrow bars, there can be many
+        first = np.searchsorted(self._bar_x1, rect.left(), side="left")
+        last = np.searchsorted(self._bar_x0, rect.right(), side="right")
+        # later bars are on top
+        for item in self._bar_items[first:last][::-1]:
+            if item.boundingRect().intersects(rect):
                 return item
         return None
 
@@ -227,6 +264,65 @@ class AshCurve:
         return ash
 
 
+_TOOLTIP_TMPL = "<p style='white-space:pre;'><b>%s</b>: %d (%.2f %%)</p>"
+
+
+def _nan_for_degenerate_scale(pdf):
+    # like scipy, give nan for scale that is not positive, without warnings
+    def wrapped(x, loc, scale):
+        valid = np.asarray(scale) > 0
+        return np.where(valid, pdf(x, loc, np.where(valid, scale, 1)), np.nan)
+    return wrapped
+
+
+@_nan_for_degenerate_scale
+def _norm_pdf(x, loc, scale):
+    z = (x - loc) / scale
+    return np.exp(-z ** 2 / 2) / (np.sqrt(2 * np.pi) * scale)
+
+
+@_nan_for_degenerate_scale
+def _expon_pdf(x, loc, scale):
+    z = (x - loc) / scale
+    return np.where(z >= 0, np.exp(-np.abs(z)) / scale, 0)
+
+
+@_nan_for_degenerate_scale
+def _rayleigh_pdf(x, loc, scale):
+    z = (x - loc) / scale
+    return np.where(z >= 0, z * np.exp(-z ** 2 / 2) / scale, 0)
+
+
+# Plain numpy densities for common distributions; scipy's pdf is much slower
+# due to argument checking and broadcasting machinery
+_FAST_PDF = {norm: _norm_pdf, expon: _expon_pdf, rayleigh: _rayleigh_pdf}
+
+
+class FitterSpec(NamedTuple):
+    label: str
+    dist: Any
+    param_names: Tuple[str, ...]
+    # density function, which is a fast numpy implementation if available
+    pdf: Optional[Callable]
+    # pairs (index of parameter, displayed name) for the legend; parameters
+    # in `aux_display` are shown in parentheses
+    main_display: Tuple[Tuple[int, str], ...]
+    aux_display: Tuple[Tuple[int, str], ...]
+
+
+def fitter_spec(label, dist, param_names, display_names):
+    """
+    Return FitterSpec; display names starting with "-" are auxiliary
+    """
+    displayed = [(i, name) for i, name in enumerate(display_names)
+                 if i < len(param_names) and name]
+    pdf = None if dist is None else _FAST_PDF.get(dist, dist.pdf)
+    return FitterSpec(
+        label, dist, param_names, pdf,
+        tuple((i, name) for i, name in displayed if name[0] != "-"),
+        tuple((i, name[1:]) for i, name in displayed if name[0] == "-"))
+
+
 class ElidedAxisNoUnits(ElidedLabelsAxis):
     def __init__(self, orientation, pen=None, linkView=None, parent=None,
                  maxTickLength=-5, showValues=True):
@@ -289,7 +385,7 @@ class OWDistributions(OWWidget):
 
     graph_name = "plot"
 
-    Fitters = (
+    Fitters = tuple(fitter_spec(*args) for args in (
         ("None", None, (), ()),
         ("Normal", norm, ("loc", "scale"), ("μ", "σ")),
         ("Beta", beta, ("a", "b", "loc", "scale"),
@@ -299,7 +395,7 @@ class OWDistributions(OWWidget):
         ("Pareto", pareto, ("b", "loc", "scale"), ("α", "-loc", "-scale")),
         ("Exponential", expon, ("loc", "scale"), ("-loc", "λ")),
         ("Kernel density", AshCurve, ("a",), ("",))
-    )
+    ))
 
     DragNone, DragAdd, DragRemove = range(3)
 
@@ -308,14 +404,28 @@ class OWDistributions(OWWidget):
         self.data = None
         self.valid_data = self.valid_group_data = None
         self.bar_items = []
+        self._bar_index = {}
+        self._x0 = self._x1 = self._pad = self._freqs_totals = np.empty(0)
+        self._bar_labels = None
+        self._histogram_indices = None
+        self._sent_selection = None
+        self._mark_items = []
         self.curve_items = []
         self.curve_descriptions = None
         self.binnings = []
+        self._color_cache = {}
+        self._float_col_cache = {}
+        self._group_indices_buf = None
+        self._escaped_values = []
+        self._last_domain = None
 
         self.last_click_idx = None
         self.drag_operation = self.DragNone
         self.key_operation = None
         self._user_var_bins = {}
+        # coalesce applies while arrow keys are held and auto-repeat
+        self._key_apply_timer = QTimer(self, singleShot=True, interval=30)
+        self._key_apply_timer.timeout.connect(self.apply.deferred)
 
         varview = gui.listView(
             self.controlArea, self, "var", box="Variable",
@@ -331,7 +441,7 @@ class OWDistributions(OWWidget):
         box = self.continuous_box = gui.vBox(self.controlArea, "Distribution")
         gui.comboBox(
             box, self, "fitted_distribution", label="Fitted distribution",
-            orientation=Qt.Horizontal, items=(name[0] for name in self.Fitters),
+            orientation=Qt.Horizontal, items=[spec.label for spec in self.Fitters],
             callback=self._on_fitted_dist_changed)
         slider = gui.hSlider(
             box, self, "number_of_bins",
@@ -435,11 +545,16 @@ class OWDistributions(OWWidget):
         self.closeContext()
         self.var = self.cvar = None
         self.data = data
+        self._color_cache.clear()
+        self._float_col_cache.clear()
+        self._group_indices_buf = None
         domain = self.data.domain if self.data else None
         varmodel = self.controls.var.model()
         cvarmodel = self.controls.cvar.model()
-        varmodel.set_domain(domain)
-        cvarmodel.set_domain(domain)
+        if domain is not self._last_domain:
+            varmodel.set_domain(domain)
+            cvarmodel.set_domain(domain)
+            self._last_domain = domain
         if varmodel:
             self.var = varmodel[min(len(domain.class_vars), len(varmodel) - 1)]
         if domain is not None and domain.has_discrete_class:
@@ -447,6 +562,7 @@ class OWDistributions(OWWidget):
         self.reset_select()
         self._user_var_bins.clear()
         self.openContext(domain)
+        self._update_escaped_values()
         self.set_valid_data()
         self.recompute_binnings()
         self.replot()
@@ -454,12 +570,14 @@ class OWDistributions(OWWidget):
 
     def _on_var_changed(self):
         self.reset_select()
+        self._update_escaped_values()
         self.set_valid_data()
         self.recompute_binnings()
         self.replot()
         self.apply.deferred()
 
     def _on_cvar_changed(self):
+        self._color_cache.clear()
         self.set_valid_data()
         self.replot()
         self.apply.deferred()
@@ -496,7 +614,7 @@ class OWDistributions(OWWidget):
 
     def _set_smoothing_visibility(self):
         self.smoothing_box.setDisabled(
-            self.Fitters[self.fitted_distribution][1] is not AshCurve)
+            self.Fitters[self.fitted_distribution].dist is not AshCurve)
 
     def _set_bin_width_slider_label(self):
         if self.number_of_bins < len(self.binnings):
@@ -523,6 +641,13 @@ class OWDistributions(OWWidget):
             label.setToolTip("")
         self.replot()
 
+    def _update_escaped_values(self):
+        # Escape values of discrete variables once, not at every replot
+        if self.var is not None and self.var.is_discrete:
+            self._escaped_values = [escape(val) for val in self.var.values]
+        else:
+            self._escaped_values = []
+
     @property
     def is_valid(self):
         return self.valid_data is not None
@@ -538,27 +663,39 @@ class OWDistributions(OWWidget):
         if self.var is None:
             return
 
-        column = self.data.get_column_view(self.var)[0].astype(float)
+        column = self._float_col(self.var)
         valid_mask = np.isfinite(column)
+        if self.cvar:
+            ccolumn = self._float_col(self.cvar)
+            np.logical_and(valid_mask, np.isfinite(ccolumn), out=valid_mask)
         if not np.any(valid_mask):
-            self.Error.no_defined_values_var(self.var.name)
+            # Distinguish the two cases only when there is an error
+            if self.cvar and np.any(np.isfinite(column)):
+                self.Error.no_defined_values_pair(self.var.name, self.cvar.name)
+            else:
+                self.Error.no_defined_values_var(self.var.name)
             return
         if self.cvar:
-            ccolumn = self.data.get_column_view(self.cvar)[0].astype(float)
-            valid_mask *= np.isfinite(ccolumn)
-            if not np.any(valid_mask):
-                self.Error.no_defined_values_pair(self.var.name, self.cvar.name)
-                return
-            self.valid_group_data = ccolumn[valid_mask]
-        if not np.all(valid_mask):
+            # cvar is discrete; keep codes as integers for indexing and counts
+            self.valid_group_data = ccolumn[valid_mask].astype(np.intp)
+        if np.all(valid_mask):
+            self.valid_data = column  # nothing to drop, so avoid a copy
+        else:
             self.Warning.ignored_nans()
-        self.valid_data = column[valid_mask]
+            self.valid_data = column[valid_mask]
+
+    def _float_col(self, var):
+        if var not in self._float_col_cache:
+            self._float_col_cache[var] = \
+                self.data.get_column_view(var)[0].astype(float, copy=False)
+        return self._float_col_cache[var]
 
     # -----------------------------
     # Plotting
 
     def replot(self):
         self._clear_plot()
+        self._sent_selection = None  # outputs are invalid for new bars
         if self.is_valid:
             self._set_axis_names()
             self._update_controls_state()
@@ -570,7 +707,13 @@ class OWDistributions(OWWidget):
         self.plot.clear()
         self.plot_pdf.clear()
         self.plot_mark.clear()
+        self._mark_items = []
         self.bar_items = []
+        self._bar_index = {}
+        self._x0 = self._x1 = self._pad = self._freqs_totals = np.empty(0)
+        self._bar_labels = None
+        self._histogram_indices = None
+        self.plotview.set_bar_items(self.bar_items, self._x0, self._x1)
         self.curve_items = []
         self._legend.clear()
         self._legend.hide()
@@ -609,6 +752,13 @@ class OWDistributions(OWWidget):
                 self._cont_split_plot()
             else:
                 self._cont_plot()
+        self._x0 = np.array([bar.x0 for bar in self.bar_items])
+        self._x1 = np.array([bar.x1 for bar in self.bar_items])
+        # half of the gap between consecutive bars
+        self._pad = (self._x0[1:] - self._x1[:-1]) / 2
+        self._freqs_totals = np.array(
+            [np.sum(bar.freqs) for bar in self.bar_items])
+        self.plotview.set_bar_items(self.bar_items, self._x0, self._x1)
         self.plot.autoRange()
 
     def _add_bar(self, x, width, padding, freqs, colors, stacked, expanded,
@@ -617,12 +767,13 @@ class OWDistributions(OWWidget):
             x, width, padding, freqs, colors, stacked, expanded, tooltip,
             desc, hidden)
         self.plot.addItem(item)
+        self._bar_index[item] = len(self.bar_items)
         self.bar_items.append(item)
 
     def _disc_plot(self):
         var = self.var
-        dist = distribution.get_distribution(self.data, self.var)
-        dist = np.array(dist)  # Distribution misbehaves in further operations
+        dist = np.bincount(self.valid_data.astype(np.intp),
+                           minlength=len(var.values))
         if self.sort_by_freq:
             order = np.argsort(dist)[::-1]
         else:
@@ -632,36 +783,42 @@ class OWDistributions(OWWidget):
         self.ploti.getAxis("bottom").setTicks([list(enumerate(ordered_values))])
 
         colors = [QColor(0, 128, 255)]
-        for i, freq, desc in zip(count(), dist[order], ordered_values):
-            tooltip = \
-                "<p style='white-space:pre;'>" \
-                f"<b>{escape(desc)}</b>: {int(freq)} " \
-                f"({100 * freq / len(self.valid_data):.2f} %) "
+        total = len(self.valid_data)
+        for i, val_idx in enumerate(order):
+            freq = dist[val_idx]
+            tooltip = _TOOLTIP_TMPL % (
+                self._escaped_values[val_idx], freq, 100 * freq / total)
             self._add_bar(
                 i - 0.5, 1, 0.1, [freq], colors,
-                stacked=False, expanded=False, tooltip=tooltip, desc=desc)
+                stacked=False, expanded=False, tooltip=tooltip,
+                desc=var.values[val_idx])
 
     def _disc_split_plot(self):
         var = self.var
-        conts = contingency.get_contingency(self.data, self.cvar, self.var)
-        conts = np.array(conts)  # Contingency misbehaves in further operations
+        nvalues, ngroups = len(var.values), len(self.cvar.values)
+        conts = np.bincount(
+            self.valid_data.astype(np.intp) * ngroups
+            + self.valid_group_data,
+            minlength=nvalues * ngroups).reshape(nvalues, ngroups)
+        bar_totals = conts.sum(axis=1)
         if self.sort_by_freq:
-            order = np.argsort(conts.sum(axis=1))[::-1]
+            order = np.argsort(bar_totals)[::-1]
         else:
             order = np.arange(len(conts))
 
         ordered_values = np.array(var.values)[order]
         self.ploti.getAxis("bottom").setTicks([list(enumerate(ordered_values))])
 
-        gcolors = [QColor(*col) for col in self.cvar.colors]
+        gcolors = self._get_cvar_colors()[0]
         gvalues = self.cvar.values
         total = len(self.data)
-        for i, freqs, desc in zip(count(), conts[order], ordered_values):
+        for i, freqs, tot, desc in zip(count(), conts[order],
+                                       bar_totals[order], ordered_values):
             self._add_bar(
                 i - 0.5, 1, 0.1, freqs, gcolors,
                 stacked=self.stacked_columns, expanded=self.show_probs,
-                tooltip=self._split_tooltip(
-                    desc, np.sum(freqs), total, gvalues, freqs),
+                tooltip=partial(self._split_tooltip,
+                                desc, tot, total, gvalues, freqs),
                 desc=desc)
 
     def _cont_plot(self):
@@ -682,10 +839,7 @@ class OWDistributions(OWWidget):
         for i, (x0, x1), freq in zip(count(), zip(x, x[1:]), y):
             tot_freq += freq
             desc = self.str_int(x0, x1, not i, i == lasti, unique)
-            tooltip = \
-                "<p style='white-space:pre;'>" \
-                f"<b>{escape(desc)}</b>: " \
-                f"{freq} ({100 * freq / total:.2f} %)</p>"
+            tooltip = _TOOLTIP_TMPL % (escape(desc), freq, 100 * freq / total)
             bar_width = width if unique else x1 - x0
             self._add_bar(
                 x0 + xoff, bar_width, 0,
@@ -702,34 +856,34 @@ class OWDistributions(OWWidget):
         self._set_cont_ticks()
         data = self.valid_data
         binning = self.binnings[self.number_of_bins]
-        _, bins = np.histogram(data, bins=binning.thresholds)
+        bins = binning.thresholds
         gvalues = self.cvar.values
-        varcolors = [QColor(*col) for col in self.cvar.colors]
-        if self.fitted_distribution:
-            gcolors = [c.lighter(130) for c in varcolors]
-        else:
-            gcolors = varcolors
+        varcolors = self._get_cvar_colors()[0]
+        gcolors = self._get_bar_colors()
         nvalues = len(gvalues)
-        ys = []
+        counts, _, _ = np.histogram2d(
+            data, self.valid_group_data,
+            bins=[bins, np.arange(nvalues + 1) - 0.5])
+        ys = counts.T.astype(int)
+        prior_sizes = counts.sum(axis=0).astype(int)
         fitters = []
-        prior_sizes = []
-        for val_idx in range(nvalues):
-            group_data = data[self.valid_group_data == val_idx]
-            prior_sizes.append(len(group_data))
-            ys.append(np.histogram(group_data, bins)[0])
-            if self.fitted_distribution:
-                fitters.append(self._fit_approximation(group_data))
+        if self.fitted_distribution:
+            order = np.argsort(self.valid_group_data, kind="stable")
+            bounds = np.searchsorted(
+                self.valid_group_data[order], np.arange(1, nvalues))
+            fitters = [self._fit_approximation(group_data)
+                       for group_data in np.split(data[order], bounds)]
         total = len(data)
-        prior_sizes = np.array(prior_sizes)
-        tot_freqs = np.zeros(len(ys))
+        if self.cumulative_distr:
+            ys = np.cumsum(ys, axis=1)
+        bar_totals = ys.sum(axis=0)
 
-        lasti = len(ys[0]) - 1
+        lasti = ys.shape[1] - 1
         width = np.min(bins[1:] - bins[:-1])
         unique = self.number_of_bins == 0 and binning.width is None
         xoff = -width / 2 if unique else 0
-        for i, x0, x1, freqs in zip(count(), bins, bins[1:], zip(*ys)):
-            tot_freqs += freqs
-            plotfreqs = tot_freqs.copy() if self.cumulative_distr else freqs
+        for i, x0, x1 in zip(count(), bins, bins[1:]):
+            plotfreqs = ys[:, i]
             desc = self.str_int(x0, x1, not i, i == lasti, unique)
             bar_width = width if unique else x1 - x0
             self._add_bar(
@@ -737,14 +891,25 @@ class OWDistributions(OWWidget):
                 plotfreqs,
                 gcolors, stacked=self.stacked_columns, expanded=self.show_probs,
                 hidden=self.hide_bars,
-                tooltip=self._split_tooltip(
-                    desc, np.sum(plotfreqs), total, gvalues, plotfreqs),
+                tooltip=partial(self._split_tooltip,
+                                desc, bar_totals[i], total, gvalues, plotfreqs),
                 desc=desc)
 
         if fitters:
             self._plot_approximations(bins[0], bins[-1], fitters, varcolors,
                                       prior_sizes / len(data))
 
+    def _get_cvar_colors(self):
+        if self.cvar not in self._color_cache:
+            colors = [QColor(*col) for col in self.cvar.colors]
+            self._color_cache[self.cvar] = \
+                colors, [c.lighter(130) for c in colors]
+        return self._color_cache[self.cvar]
+
+    def _get_bar_colors(self):
+        colors, lighter = self._get_cvar_colors()
+        return lighter if self.fitted_distribution else colors
+
     def _set_cont_ticks(self):
         axis = self.ploti.getAxis("bottom")
         if self.var and self.var.is_time:
@@ -771,53 +936,60 @@ class OWDistributions(OWWidget):
             return ", ".join(f"{sname}={strv(val)}" for sname, val in pairs)
 
         def str_params():
-            s = join_pars(
-                (sname, val) for sname, val in zip(str_names, fitted)
-                if sname and sname[0] != "-")
-            par = join_pars(
-                (sname[1:], val) for sname, val in zip(str_names, fitted)
-                if sname and sname[0] == "-")
+            s = join_pars((sname, fitted[i]) for i, sname in spec.main_display)
+            par = join_pars((sname, fitted[i]) for i, sname in spec.aux_display)
             if par:
                 s += f" ({par})"
             return s
 
         if not y.size:
             return None, None
-        _, dist, names, str_names = self.Fitters[self.fitted_distribution]
-        fitted = dist.fit(y)
-        params = dict(zip(names, fitted))
-        return partial(dist.pdf, **params), str_params()
+        spec = self.Fitters[self.fitted_distribution]
+        fitted = spec.dist.fit(y)
+        return dict(zip(spec.param_names, fitted)), str_params()
 
     def _plot_approximations(self, x0, x1, fitters, colors, prior_probs):
         x = np.linspace(x0, x1, 100)
         ys = np.zeros((len(fitters), 100))
         self.curve_descriptions = [s for _, s in fitters]
-        for y, (fitter, _) in zip(ys, fitters):
-            if fitter is None:
-                continue
-            if self.Fitters[self.fitted_distribution][1] is AshCurve:
-                y[:] = fitter(x, sigma=(22 - self.kde_smoothing) / 40)
-            else:
-                y[:] = fitter(x)
-            if self.cumulative_distr:
-                y[:] = np.cumsum(y)
-        tots = np.sum(ys, axis=0)
+        spec = self.Fitters[self.fitted_distribution]
+        fitted = [i for i, (params, _) in enumerate(fitters)
+                  if params is not None]
+        if spec.dist is AshCurve:
+            sigma = (22 - self.kde_smoothing) / 40
+            for i in fitted:
+                ys[i] = spec.pdf(x, sigma=sigma, **fitters[i][0])
+        elif fitted:
+            # Evaluate all groups in a single call by broadcasting parameters
+            stacked = {
+                name: np.array([fitters[i][0][name] for i in fitted])[:, None]
+                for name in spec.param_names}
+            ys[fitted] = spec.pdf(x, **stacked)
+        if self.cumulative_distr:
+            np.cumsum(ys, axis=1, out=ys)
 
         show_probs = self.show_probs and self.cvar is not None
         plot = self.ploti if show_probs else self.plot_pdf
 
+        if show_probs:
+            priors = np.asarray(prior_probs)[:, None]
+            ys_p = ys * priors
+            tots = ys_p + (np.sum(ys, axis=0) - ys) * (1 - priors)
+            tots[tots == 0] = 1
+            ys = ys_p / tots
+
+        # With many curves, skip shadows and antialiasing to speed up drawing
+        with_shadow = len(fitters) <= 3
+        opts = {} if len(fitters) <= 6 else {"antialias": False}
         for y, prior_prob, color in zip(ys, prior_probs, colors):
             if not prior_prob:
                 continue
-            if show_probs:
-                y_p = y * prior_prob
-                tot = (y_p + (tots - y) * (1 - prior_prob))
-                tot[tot == 0] = 1
-                y = y_p / tot
+            shadow_pen = pg.mkPen(width=8, color=color.darker(120)) \
+                if with_shadow else None
             curve = pg.PlotCurveItem(
                 x=x, y=y, fillLevel=0,
-                pen=pg.mkPen(width=5, color=color),
-                shadowPen=pg.mkPen(width=8, color=color.darker(120)))
+                pen=pg.mkPen(width=5, color=color), shadowPen=shadow_pen,
+                **opts)
             plot.addItem(curve)
             self.curve_items.append(curve)
         if not show_probs:
@@ -867,7 +1039,7 @@ class OWDistributions(OWWidget):
                 self.curve_descriptions[0])
         else:
             cvar_values = self.cvar.values
-            colors = [QColor(*col) for col in self.cvar.colors]
+            colors = self._get_cvar_colors()[0]
             descriptions = self.curve_descriptions or repeat(None)
             for color, name, desc in zip(colors, cvar_values, descriptions):
                 self._legend.addItem(
@@ -881,7 +1053,7 @@ class OWDistributions(OWWidget):
     def recompute_binnings(self):
         if self.is_valid and self.var.is_continuous:
             # binning is computed on valid var data, ignoring any cvar nans
-            column = self.data.get_column_view(self.var)[0].astype(float)
+            column = self._float_col(self.var)
             if np.any(np.isfinite(column)):
                 if self.var.is_time:
                     self.binnings = time_binnings(column, min_unique=5)
@@ -946,22 +1118,22 @@ class OWDistributions(OWWidget):
         def add_range(add):
             if self.last_click_idx is None:
                 add = True
-                idx_range = {idx}
+                idx_range = (idx, )
             else:
                 from_idx, to_idx = sorted((self.last_click_idx, idx))
-                idx_range = set(range(from_idx, to_idx + 1))
+                idx_range = range(from_idx, to_idx + 1)
             self.drag_operation = [self.DragRemove, self.DragAdd][add]
             if add:
-                self.selection |= idx_range
+                self.selection.update(idx_range)
             else:
-                self.selection -= idx_range
+                self.selection.difference_update(idx_range)
 
         self.key_operation = None
         if item is None:
             self.reset_select()
             return
 
-        idx = self.bar_items.index(item)
+        idx = self._bar_index[item]
         if drag:
             # Dragging has to add a range, otherwise fast dragging skips bars
             add_range(self.drag_operation == self.DragAdd)
@@ -997,48 +1169,50 @@ class OWDistributions(OWWidget):
         self.apply.deferred()
 
     def show_selection(self):
-        self.plot_mark.clear()
-        if not self.is_valid:  # though if it's not, selection is empty anyway
-            return
-
-        blue = QColor(Qt.blue)
-        pen = QPen(QBrush(blue), 3)
-        pen.setCosmetic(True)
-        brush = QBrush(blue.lighter(190))
-
-        for group in self.grouped_selection():
-            group = list(group)
+        # though if data is not valid, selection is empty anyway
+        groups = self.grouped_selection() if self.is_valid else []
+
+        # Marks are reused until the plot is cleared; add any missing ones
+        # and hide those that are not needed
+        if len(self._mark_items) < len(groups):
+            blue = QColor(Qt.blue)
+            pen = QPen(QBrush(blue), 3)
+            pen.setCosmetic(True)
+            brush = QBrush(blue.lighter(190))
+            for _ in range(len(groups) - len(self._mark_items)):
+                item = QGraphicsRectItem()
+                item.setPen(pen)
+                item.setBrush(brush)
+                self.plot_mark.addItem(item)
+                self._mark_items.append(item)
+        for item in self._mark_items[len(groups):]:
+            item.hide()
+
+        for item, group in zip(self._mark_items, groups):
             left_idx, right_idx = group[0], group[-1]
             left_pad, right_pad = self._determine_padding(left_idx, right_idx)
-            x0 = self.bar_items[left_idx].x0 - left_pad
-            x1 = self.bar_items[right_idx].x1 + right_pad
-            item = QGraphicsRectItem(x0, 0, x1 - x0, 1)
-            item.setPen(pen)
-            item.setBrush(brush)
+            x0 = self._x0[left_idx] - left_pad
+            x1 = self._x1[right_idx] + right_pad
+            item.setRect(x0, 0, x1 - x0, 1)
+            item.show()
             if self.var.is_continuous:
                 valname = self.str_int(
                     x0, x1, not left_idx, right_idx == len(self.bar_items) - 1)
-                inside = sum(np.sum(self.bar_items[i].freqs) for i in group)
+                inside = self._freqs_totals[left_idx:right_idx + 1].sum()
                 total = len(self.valid_data)
-                item.setToolTip(
-                    "<p style='white-space:pre;'>"
-                    f"<b>{escape(valname)}</b>: "
-                    f"{inside} ({100 * inside / total:.2f} %)")
-            self.plot_mark.addItem(item)
+                item.setToolTip(_TOOLTIP_TMPL % (
+                    escape(valname), inside, 100 * inside / total))
 
     def _determine_padding(self, left_idx, right_idx):
-        def _padding(i):
-            return (self.bar_items[i + 1].x0 - self.bar_items[i].x1) / 2
-
         if len(self.bar_items) == 1:
             return 6, 6
         if left_idx == 0 and right_idx == len(self.bar_items) - 1:
-            return (_padding(0), ) * 2
+            return (self._pad[0], ) * 2
 
         if left_idx > 0:
-            left_pad = _padding(left_idx - 1)
+            left_pad = self._pad[left_idx - 1]
         if right_idx < len(self.bar_items) - 1:
-            right_pad = _padding(right_idx)
+            right_pad = self._pad[right_idx]
         else:
             right_pad = left_pad
         if left_idx == 0:
@@ -1046,9 +1220,13 @@ class OWDistributions(OWWidget):
         return left_pad, right_pad
 
     def grouped_selection(self):
-        return [[g[1] for g in group]
-                for _, group in groupby(enumerate(sorted(self.selection)),
-                                        key=lambda x: x[1] - x[0])]
+        if not self.selection:
+            return []
+        selection = np.fromiter(self.selection, dtype=int,
+                                count=len(self.selection))
+        selection.sort()
+        # split into runs of consecutive indices
+        return np.split(selection, np.flatnonzero(np.diff(selection) != 1) + 1)
 
     def keyPressEvent(self, e):
         def on_nothing_selected():
@@ -1104,7 +1282,7 @@ class OWDistributions(OWWidget):
         if self.selection != prev_selection:
             self.drag_operation = self.DragAdd
             self.show_selection()
-            self.apply.deferred()
+            self._key_apply_timer.start()
 
     def keyReleaseEvent(self, ev):
         if ev.key() == Qt.Key_Shift:
@@ -1117,15 +1295,29 @@ class OWDistributions(OWWidget):
 
     @gui.deferred
     def apply(self):
+        self._key_apply_timer.stop()
+        # Outputs depend only on bars and selection. Replot resets the sent
+        # selection, so if it is unchanged, outputs are the same as sent.
+        selection = frozenset(self.selection)
+        if selection == self._sent_selection:
+            return
+        bars_changed = self._sent_selection is None
+        self._sent_selection = selection
+
         data = self.data
         selected_data = annotated_data = histogram_data = None
         if self.is_valid:
+            # group indices are not kept by the output tables; reuse the array
+            if self._group_indices_buf is None:
+                self._group_indices_buf = np.empty(len(data), dtype=np.int32)
+            out = self._group_indices_buf
             if self.var.is_discrete:
-                group_indices, values = self._get_output_indices_disc()
+                col = self._float_col(self.var)
+                group_indices, values = self._get_output_indices_disc(col, out)
             else:
-                group_indices, values = self._get_output_indices_cont()
-            selected = np.nonzero(group_indices)[0]
-            if selected.size:
+                group_indices, values = self._get_output_indices_cont(out)
+            selected = group_indices != 0
+            if selected.any():
                 selected_data = create_groups_table(
                     data, group_indices,
                     include_unselected=False, values=values)
@@ -1134,36 +1326,41 @@ class OWDistributions(OWWidget):
                 hist_indices, hist_values = self._get_histogram_indices()
                 annotated_data = create_groups_table(
                     annotated_data, hist_indices, var_name="Bin", values=hist_values)
-            histogram_data = self._get_histogram_table()
+            if bars_changed:
+                histogram_data = self._get_histogram_table()
 
         self.Outputs.selected_data.send(selected_data)
         self.Outputs.annotated_data.send(annotated_data)
-        self.Outputs.histogram_data.send(histogram_data)
-
-    def _get_output_indices_disc(self):
-        group_indices = np.zeros(len(self.data), dtype=np.int32)
-        col = self.data.get_column_view(self.var)[0].astype(float)
-        for group_idx, val_idx in enumerate(self.selection, start=1):
-            group_indices[col == val_idx] = group_idx
-        values = [self.var.values[i] for i in self.selection]
-        return group_indices, values
-
-    def _get_output_indices_cont(self):
-        group_indices = np.zeros(len(self.data), dtype=np.int32)
-        col = self.data.get_column_view(self.var)[0].astype(float)
-        values = []
-        for group_idx, group in enumerate(self.grouped_selection(), start=1):
-            x0 = x1 = None
-            for bar_idx in group:
-                minx, maxx, mask = self._get_cont_baritem_indices(col, bar_idx)
-                if x0 is None:
-                    x0 = minx
-                x1 = maxx
-                group_indices[mask] = group_idx
-            # pylint: disable=undefined-loop-variable
-            values.append(
-                self.str_int(x0, x1, not bar_idx, self._is_last_bar(bar_idx)))
-        return group_indices, values
+        if bars_changed:  # histogram does not depend on selection
+            self.Outputs.histogram_data.send(histogram_data)
+
+    def _get_output_indices_disc(self, col, out):
+        selection = list(self.selection)
+        # map values to group indices with a lookup table; 0 is unselected
+        lookup = np.zeros(len(self.var.values), dtype=np.int32)
+        lookup[selection] = np.arange(1, len(selection) + 1)
+        defined = np.isfinite(col)
+        out.fill(0)
+        out[defined] = lookup[col[defined].astype(np.intp)]
+        values = [self.var.values[i] for i in selection]
+        return out, values
+
+    def _get_output_indices_cont(self, out):
+        # map bins (bar index + 1, 0 for no bar) to group indices
+        groups = self.grouped_selection()
+        bin_to_group = np.zeros(len(self.bar_items) + 1, dtype=np.int32)
+        for group_idx, group in enumerate(groups, start=1):
+            bin_to_group[group + 1] = group_idx
+        values = [self._group_label(group[0], group[-1]) for group in groups]
+        bin_indices, _ = self._get_histogram_indices()
+        return np.take(bin_to_group, bin_indices, out=out), values
+
+    def _group_label(self, left_idx, right_idx):
+        if left_idx == right_idx:
+            return self._get_bar_labels()[left_idx]
+        last = self._is_last_bar(right_idx)
+        return self.str_int(self._x0[left_idx], self._x1[right_idx] + last,
+                            not right_idx, last)
 
     def _get_histogram_table(self):
         var_bin = DiscreteVariable("Bin", [bar.desc for bar in self.bar_items])
@@ -1181,22 +1378,36 @@ class OWDistributions(OWWidget):
         return Table.from_numpy(domain, X)
 
     def _get_histogram_indices(self):
-        group_indices = np.zeros(len(self.data), dtype=np.int32)
-        col = self.data.get_column_view(self.var)[0].astype(float)
-        values = []
-        for bar_idx in range(len(self.bar_items)):
-            x0, x1, mask = self._get_cont_baritem_indices(col, bar_idx)
-            group_indices[mask] = bar_idx + 1
-            values.append(
-                self.str_int(x0, x1, not bar_idx, self._is_last_bar(bar_idx)))
-        return group_indices, values
-
-    def _get_cont_baritem_indices(self, col, bar_idx):
-        bar_item = self.bar_items[bar_idx]
-        minx = bar_item.x0
-        maxx = bar_item.x1 + (bar_idx == len(self.bar_items) - 1)
-        with np.errstate(invalid="ignore"):
-            return minx, maxx, (col >= minx) * (col < maxx)
+        # bins do not depend on selection; recompute only after replot
+        if self._histogram_indices is None:
+            self._histogram_indices = self._compute_histogram_indices()
+        return self._histogram_indices
+
+    def _compute_histogram_indices(self):
+        col = self._float_col(self.var)
+        nbars = len(self.bar_items)
+        # Bars are sorted and do not overlap, so interleaved edges are sorted;
+        # a value lies within bar i iff it falls into the interval 2 * i + 1.
+        # Values in gaps, outside the range or nan fall into even intervals.
+        edges = np.empty(2 * nbars)
+        edges[::2] = self._x0
+        edges[1::2] = self._x1
+        edges[-1] += 1  # the last bar also includes its right edge
+        interval_to_bin = np.zeros(2 * nbars + 1, dtype=np.int32)
+        interval_to_bin[1::2] = np.arange(1, nbars + 1)
+        group_indices = interval_to_bin[
+            np.searchsorted(edges, col, side="right")]
+        return group_indices, self._get_bar_labels()
+
+    def _get_bar_labels(self):
+        # labels of continuous bars for output; formatted on first use, so
+        # that replotting while dragging the bin slider does not do it
+        if self._bar_labels is None:
+            nbars = len(self.bar_items)
+            self._bar_labels = [
+                self.str_int(x0, x1 + (i == nbars - 1), not i, i == nbars - 1)
+                for i, x0, x1 in zip(count(), self._x0, self._x1)]
+        return self._bar_labels
 
     def _is_last_bar(self, idx):
         return idx == len(self.bar_items) - 1
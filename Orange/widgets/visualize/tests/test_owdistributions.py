@@ -2,10 +2,11 @@
 # pylint: disable=missing-docstring,protected-access
 import os
 import unittest
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import numpy as np
-from AnyQt.QtCore import QItemSelection, Qt
+from AnyQt.QtCore import QEvent, QItemSelection, QPoint, Qt
+from AnyQt.QtGui import QKeyEvent
 from AnyQt.QtWidgets import QCheckBox
 
 from orangewidget.utils.combobox import qcombobox_emit_activated
@@ -14,7 +15,8 @@ from Orange.data import Table, Domain, DiscreteVariable
 from Orange.widgets.tests.base import WidgetTest
 from Orange.widgets.utils.annotated_data import ANNOTATED_DATA_FEATURE_NAME
 from Orange.widgets.utils.itemmodels import DomainModel
-from Orange.widgets.visualize.owdistributions import OWDistributions
+from Orange.widgets.visualize.owdistributions import OWDistributions, \
+    DistributionBarItem, _FAST_PDF
 
 
 class TestOWDistributions(WidgetTest):
@@ -71,6 +73,7 @@ class TestOWDistributions(WidgetTest):
         self.assertIs(widget.cvar, domain.class_var)
         np.testing.assert_equal(widget.valid_data, self.iris.X[:, 0])
         np.testing.assert_equal(widget.valid_group_data, self.iris.Y)
+        self.assertEqual(widget.valid_group_data.dtype, np.intp)
         self.assertIsNotNone(self.get_output(widget.Outputs.histogram_data))
         self.assertIsNotNone(self.get_output(widget.Outputs.annotated_data))
         self.assertIsNone(self.get_output(widget.Outputs.selected_data))
@@ -92,6 +95,21 @@ class TestOWDistributions(WidgetTest):
         self.assertIsNone(self.get_output(widget.Outputs.selected_data))
         widget._clear_plot.assert_called()
 
+    def test_set_data_same_domain(self):
+        widget = self.widget
+        var_model = widget.controls.var.model()
+        self.send_signal(widget.Inputs.data, self.iris)
+        self._set_var(self.iris.domain[2])
+
+        var_model.set_domain = Mock(wraps=var_model.set_domain)
+        self.send_signal(widget.Inputs.data, self.iris[:100])
+        var_model.set_domain.assert_not_called()
+        self.assertIs(widget.var, self.iris.domain[2])
+        self.assertEqual(len(widget.valid_data), 100)
+
+        self.send_signal(widget.Inputs.data, None)
+        var_model.set_domain.assert_called_with(None)
+
     def test_set_data_no_class_no_discrete(self):
         """Widget is properly set up when there is no class and discrete vars"""
         widget = self.widget
@@ -264,6 +282,47 @@ class TestOWDistributions(WidgetTest):
         self.assertGreater(n_bars, len(widget.bar_items))
         widget.apply.now.assert_called_once()
 
+    def test_histogram_indices_reused(self):
+        """Bin indices are recomputed only when bars change"""
+        widget = self.widget
+        self.send_signal(widget.Inputs.data, self.iris)
+        self._set_slider(0)
+        compute = widget._compute_histogram_indices = \
+            Mock(wraps=widget._compute_histogram_indices)
+
+        widget.selection = {1, 2}
+        widget.apply.now()
+        widget.selection = {4}
+        widget.apply.now()
+        compute.assert_not_called()
+
+        self._set_slider(1)
+        compute.assert_called_once()
+        out = self.get_output(widget.Outputs.annotated_data)
+        bins = out.get_column_view("Bin")[0]
+        self.assertEqual(len(np.unique(bins)), len(widget.bar_items))
+
+    def test_send_only_changed_outputs(self):
+        """Outputs are sent only when bars or selection change"""
+        widget = self.widget
+        self.send_signal(widget.Inputs.data, self.iris)
+        self._set_slider(0)
+        selected = widget.Outputs.selected_data.send = Mock()
+        histogram = widget.Outputs.histogram_data.send = Mock()
+
+        widget.selection = {1, 2}
+        widget.apply.now()
+        selected.assert_called_once()
+        histogram.assert_not_called()
+
+        selected.reset_mock()
+        widget.apply.now()
+        selected.assert_not_called()
+
+        self._set_slider(1)
+        selected.assert_called_once()
+        histogram.assert_called_once()
+
     def test_set_valid_data(self):
         """Widget handles nans in data"""
         widget = self.widget
@@ -464,6 +523,8 @@ class TestOWDistributions(WidgetTest):
         self.send_signal(widget.Inputs.data, self.iris)
         self._set_slider(0)
         widget.selection = {1, 2, 3, 5, 6, 9}
+        self.assertEqual([list(group) for group in widget.grouped_selection()],
+                         [[1, 2, 3], [5, 6], [9]])
         widget.plot_mark.addItem = Mock()
         widget.show_selection()
         widget._on_end_selecting()
@@ -472,6 +533,99 @@ class TestOWDistributions(WidgetTest):
         self.assertEqual(
             len(out_selected.domain[ANNOTATED_DATA_FEATURE_NAME].values), 3)
 
+        widget.selection = {4}
+        widget.show_selection()
+        self.assertEqual(widget.plot_mark.addItem.call_count, 3)
+        self.assertEqual(
+            [item.isVisible() for item in widget._mark_items],
+            [True, False, False])
+
+        widget.selection = set()
+        self.assertEqual(widget.grouped_selection(), [])
+
+    def test_key_selection(self):
+        """Arrow keys move and shift+arrow keys extend selection"""
+        widget = self.widget
+        self.send_signal(widget.Inputs.data, self.iris)
+        self._set_slider(0)
+
+        def press(key, modifiers=Qt.NoModifier):
+            widget.keyPressEvent(
+                QKeyEvent(QEvent.KeyPress, key, modifiers))
+
+        widget.selection = {3, 2}
+        press(Qt.Key_Left)
+        self.assertEqual(widget.selection, {1})
+        press(Qt.Key_Right, Qt.ShiftModifier)
+        press(Qt.Key_Right, Qt.ShiftModifier)
+        self.assertEqual(widget.selection, {1, 2, 3})
+        press(Qt.Key_Left, Qt.ShiftModifier)
+        self.assertEqual(widget.selection, {1, 2})
+        self.assertTrue(all(type(i) is int for i in widget.selection))
+
+        # outputs are sent after key presses stop
+        timer = widget._key_apply_timer
+        self.assertTrue(timer.isActive())
+        self.process_events(lambda: not timer.isActive())
+        out = self.get_output(widget.Outputs.selected_data)
+        self.assertEqual(len(out), widget._freqs_totals[1:3].sum())
+
+    def test_click_and_drag_selection(self):
+        widget = self.widget
+        self.send_signal(widget.Inputs.data, self.iris)
+        self._set_slider(0)
+        bars = widget.bar_items
+        click = widget._on_item_clicked
+
+        click(bars[1], Qt.NoModifier, False)
+        self.assertEqual(widget.selection, {1})
+        click(bars[4], Qt.NoModifier, True)
+        self.assertEqual(widget.selection, {1, 2, 3, 4})
+        click(bars[7], Qt.ControlModifier, False)
+        self.assertEqual(widget.selection, {1, 2, 3, 4, 7})
+        click(bars[5], Qt.ShiftModifier, False)
+        self.assertEqual(widget.selection, {1, 2, 3, 4, 5, 6, 7})
+
+        click(bars[3], Qt.ControlModifier, False)
+        self.assertEqual(widget.selection, {1, 2, 4, 5, 6, 7})
+        click(bars[1], Qt.NoModifier, True)
+        self.assertEqual(widget.selection, {4, 5, 6, 7})
+
+    def _assert_bar_items(self, xs, ystep):
+        view = self.widget.plotview
+        self.widget.grab()
+        for x in xs:
+            for y in range(0, view.height(), ystep):
+                pos = QPoint(x, y)
+                expected = next(
+                    (item for item in view.items(pos)
+                     if isinstance(item, DistributionBarItem)), None)
+                self.assertIs(view._get_bar_item(pos), expected)
+
+    def test_get_bar_item(self):
+        widget = self.widget
+        self.send_signal(widget.Inputs.data, self.iris)
+        for cvar in (None, self.iris.domain.class_var):
+            self._set_cvar(cvar)
+            self._assert_bar_items(range(0, self.widget.plotview.width(), 5),
+                                   10)
+
+    def test_get_bar_item_narrow_bars(self):
+        """Find the bar under the mouse when a pixel covers several bars"""
+        widget = self.widget
+        n = 100
+        var = DiscreteVariable("d", values=tuple(f"v{i}" for i in range(n)))
+        # bars of different heights, so that the top one is not always last
+        x = np.random.default_rng(0).integers(0, n, 3 * n)
+        data = Table.from_numpy(Domain([var]), x.reshape(-1, 1))
+        self.send_signal(widget.Inputs.data, data)
+        # zoom out, so that a pixel covers a few bars
+        view = widget.plotview
+        widget.grab()  # lay out the widget to get the actual view width
+        span = 3 * view.width()
+        widget.plot.setXRange((n - span) / 2, (n + span) / 2, padding=0)
+        self._assert_bar_items(range(view.width()), 10)
+
     def test_disable_hide_bars(self):
         widget = self.widget
         self.send_signal(widget.Inputs.data, self.iris)
@@ -519,6 +673,17 @@ class TestOWDistributions(WidgetTest):
             self.assertTrue(all(curve.opts["brush"] is not None
                                 for curve in widget.curve_items))
 
+    def test_split_tooltips_on_hover(self):
+        widget = self.widget
+        self.send_signal(widget.Inputs.data, self.iris)
+        for var in (self.iris.domain[0], self.iris.domain.class_var):
+            self._set_var(var)
+            bar = widget.bar_items[0]
+            self.assertEqual(bar.toolTip(), "")
+            with patch("pyqtgraph.GraphicsObject.hoverEnterEvent"):
+                bar.hoverEnterEvent(Mock())
+            self.assertIn("<table", bar.toolTip())
+
     def test_report(self):
         """Report doesn't crash"""
         widget = self.widget
@@ -576,5 +741,33 @@ class TestOWDistributions(WidgetTest):
         self.assertEqual(out[4][2], 45)
 
 
+class TestFastPdf(unittest.TestCase):
+    def test_matches_scipy(self):
+        x = np.linspace(-3, 7, 101)
+        for dist, pdf in _FAST_PDF.items():
+            for loc, scale in ((0, 1), (1.5, 0.5), (2, 3)):
+                np.testing.assert_allclose(
+                    pdf(x, loc=loc, scale=scale),
+                    dist.pdf(x, loc=loc, scale=scale),
+                    atol=1e-12, err_msg=dist.name)
+
+            # parameters for several groups at once, as when plotting
+            loc, scale = np.array([[0], [1.5]]), np.array([[1], [0.5]])
+            np.testing.assert_allclose(
+                pdf(x, loc=loc, scale=scale),
+                dist.pdf(x, loc=loc, scale=scale),
+                atol=1e-12, err_msg=dist.name)
+
+    def test_degenerate_scale(self):
+        x = np.linspace(-3, 7, 100)
+        for dist, pdf in _FAST_PDF.items():
+            for scale in (0, np.nan, np.array([[0], [1]])):
+                with np.errstate(all="raise"):
+                    y = pdf(x, loc=2, scale=scale)
+                np.testing.assert_allclose(
+                    y, dist.pdf(x, loc=2, scale=scale),
+                    atol=1e-12, err_msg=dist.name)
+
+
 if __name__ == "__main__":
     unittest.main()